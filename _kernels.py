@@ -0,0 +1,383 @@
+# ------------------------------------------------------------
+# ビットボードの計算カーネル (合法手生成・反転石計算)
+#   ビルド済みの C 版 (bitboard_kernels.c) を cffi で読み込めればそれを、
+#   numba が入っていれば uint64 の JIT 関数として、
+#   どちらもなければ同じ本体を素の Python 関数として使う。
+#   本体は分岐を持たないビット演算だけで書いてあるので、
+#   numpy の uint64 配列を渡せば複数局面をまとめて (SIMD で) 処理できる。
+#   (配列を渡したとき引数を書き換えないよう、累算代入 |= / &= は使わない)
+# ------------------------------------------------------------
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import numba
+except ImportError:  # numba なしでも動くように純 Python にフォールバック
+    numba = None
+try:
+    from cffi import FFI
+except ImportError:
+    FFI = None
+
+# numba 使用時は定数も uint64 にそろえる (int64 と混ざると型推論が崩れるため)
+_U = np.uint64 if numba is not None else int
+
+# 純 Python のときは左シフトで 64 ビットを超えうるが、各シフトの結果はすぐに
+# 64 ビット以内のマスク (pro / empty / fill) と & を取るので、桁あふれした int が
+# 変数に残ることはない。そのため _MASK64 を掛けるのは empty を作るときだけでよい。
+_MASK64 = _U(0xFFFFFFFFFFFFFFFF)
+# A列・H列を除いた内側 6 列のマスク (横・斜め方向の回り込み防止用)
+_NOT_FILE_AH = _U(0x7E7E7E7E7E7E7E7E)
+_ZERO = _U(0)
+
+
+def _legal_moves(player, opponent):
+    """
+    player, opponent: 手番側 / 相手側のビットボード
+    戻り値: 合法手のビットボード
+    8方向の展開は _moves_and_fills と共通にして、fill を捨てて合法手だけを返す。
+    """
+    return _moves_and_fills_impl(player, opponent, ~(player | opponent) & _MASK64)[0]
+
+
+def _moves_and_fills(player, opponent, empty):
+    """
+    player, opponent: 手番側 / 相手側のビットボード
+    empty: 空きマスのビットボード (呼び出し側で計算済みのものを受け取る)
+    戻り値: (合法手のビットボード, 8方向ぶんの fill のタプル)
+    fill は「自分の石から相手石の上を塗り広げたときに届いた相手石」で、
+    合法手生成の途中結果をそのまま残しておき、着手時の反転計算 (_flips_from_fills) で再利用する。
+    方向の並びは 東, 西, 北, 南, 北東, 北西, 南東, 南西。
+    """
+    inner = opponent & _NOT_FILE_AH
+    moves = _ZERO
+
+    # 東
+    pro = inner
+    g = player
+    g = g | (pro & (g << 1))
+    pro = pro & (pro << 1)
+    g = g | (pro & (g << 2))
+    pro = pro & (pro << 2)
+    g = g | (pro & (g << 4))
+    f_e = g & inner
+    moves = moves | (empty & (f_e << 1))
+
+    # 西
+    pro = inner
+    g = player
+    g = g | (pro & (g >> 1))
+    pro = pro & (pro >> 1)
+    g = g | (pro & (g >> 2))
+    pro = pro & (pro >> 2)
+    g = g | (pro & (g >> 4))
+    f_w = g & inner
+    moves = moves | (empty & (f_w >> 1))
+
+    # 北
+    pro = opponent
+    g = player
+    g = g | (pro & (g << 8))
+    pro = pro & (pro << 8)
+    g = g | (pro & (g << 16))
+    pro = pro & (pro << 16)
+    g = g | (pro & (g << 32))
+    f_n = g & opponent
+    moves = moves | (empty & (f_n << 8))
+
+    # 南
+    pro = opponent
+    g = player
+    g = g | (pro & (g >> 8))
+    pro = pro & (pro >> 8)
+    g = g | (pro & (g >> 16))
+    pro = pro & (pro >> 16)
+    g = g | (pro & (g >> 32))
+    f_s = g & opponent
+    moves = moves | (empty & (f_s >> 8))
+
+    # 北東
+    pro = inner
+    g = player
+    g = g | (pro & (g << 9))
+    pro = pro & (pro << 9)
+    g = g | (pro & (g << 18))
+    pro = pro & (pro << 18)
+    g = g | (pro & (g << 36))
+    f_ne = g & inner
+    moves = moves | (empty & (f_ne << 9))
+
+    # 北西
+    pro = inner
+    g = player
+    g = g | (pro & (g << 7))
+    pro = pro & (pro << 7)
+    g = g | (pro & (g << 14))
+    pro = pro & (pro << 14)
+    g = g | (pro & (g << 28))
+    f_nw = g & inner
+    moves = moves | (empty & (f_nw << 7))
+
+    # 南東
+    pro = inner
+    g = player
+    g = g | (pro & (g >> 7))
+    pro = pro & (pro >> 7)
+    g = g | (pro & (g >> 14))
+    pro = pro & (pro >> 14)
+    g = g | (pro & (g >> 28))
+    f_se = g & inner
+    moves = moves | (empty & (f_se >> 7))
+
+    # 南西
+    pro = inner
+    g = player
+    g = g | (pro & (g >> 9))
+    pro = pro & (pro >> 9)
+    g = g | (pro & (g >> 18))
+    pro = pro & (pro >> 18)
+    g = g | (pro & (g >> 36))
+    f_sw = g & inner
+    moves = moves | (empty & (f_sw >> 9))
+
+    return moves, (f_e, f_w, f_n, f_s, f_ne, f_nw, f_se, f_sw)
+
+
+# _legal_moves から呼ぶ実体。numba 使用時は JIT 版でないと njit / vectorize の中から呼べない
+if numba is not None:
+    _moves_and_fills_impl = numba.njit(cache=True)(_moves_and_fills)
+else:
+    _moves_and_fills_impl = _moves_and_fills
+
+
+def _flips_from_fills(move_bb, opponent, fills):
+    """
+    move_bb: 着手位置のビット (1ビットのみ、合法手であること)
+    opponent: 相手側のビットボード
+    fills: _moves_and_fills が返した 8方向ぶんの fill
+    戻り値: その着手で反転する相手石のビットボード
+    着手位置から fill と逆向きに相手石の列を塗り、fill と重なった部分が反転対象になる。
+    (列の先に自分の石がある場合に限り、列全体が fill に含まれている)
+    """
+    inner = opponent & _NOT_FILE_AH
+    f_e, f_w, f_n, f_s, f_ne, f_nw, f_se, f_sw = fills
+    total = _ZERO
+
+    # 東 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g >> 1))
+    pro = pro & (pro >> 1)
+    g = g | (pro & (g >> 2))
+    pro = pro & (pro >> 2)
+    g = g | (pro & (g >> 4))
+    total = total | (g & f_e)
+
+    # 西 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g << 1))
+    pro = pro & (pro << 1)
+    g = g | (pro & (g << 2))
+    pro = pro & (pro << 2)
+    g = g | (pro & (g << 4))
+    total = total | (g & f_w)
+
+    # 北 (着手位置からは逆向きに塗る)
+    pro = opponent
+    g = move_bb
+    g = g | (pro & (g >> 8))
+    pro = pro & (pro >> 8)
+    g = g | (pro & (g >> 16))
+    pro = pro & (pro >> 16)
+    g = g | (pro & (g >> 32))
+    total = total | (g & f_n)
+
+    # 南 (着手位置からは逆向きに塗る)
+    pro = opponent
+    g = move_bb
+    g = g | (pro & (g << 8))
+    pro = pro & (pro << 8)
+    g = g | (pro & (g << 16))
+    pro = pro & (pro << 16)
+    g = g | (pro & (g << 32))
+    total = total | (g & f_s)
+
+    # 北東 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g >> 9))
+    pro = pro & (pro >> 9)
+    g = g | (pro & (g >> 18))
+    pro = pro & (pro >> 18)
+    g = g | (pro & (g >> 36))
+    total = total | (g & f_ne)
+
+    # 北西 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g >> 7))
+    pro = pro & (pro >> 7)
+    g = g | (pro & (g >> 14))
+    pro = pro & (pro >> 14)
+    g = g | (pro & (g >> 28))
+    total = total | (g & f_nw)
+
+    # 南東 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g << 7))
+    pro = pro & (pro << 7)
+    g = g | (pro & (g << 14))
+    pro = pro & (pro << 14)
+    g = g | (pro & (g << 28))
+    total = total | (g & f_se)
+
+    # 南西 (着手位置からは逆向きに塗る)
+    pro = inner
+    g = move_bb
+    g = g | (pro & (g << 9))
+    pro = pro & (pro << 9)
+    g = g | (pro & (g << 18))
+    pro = pro & (pro << 18)
+    g = g | (pro & (g << 36))
+    total = total | (g & f_sw)
+
+    return total
+
+
+# ------------------------------------------------------------
+# マスごとの 8方向の「光線」マスクの表 (純 Python 用の反転計算で使う)
+#   _RAYS[sq] = (東, 西, 北, 南, 北東, 北西, 南東, 南西) の順に、
+#   マス sq から盤端までその方向に並ぶマス (sq 自身は含まない) のビットボード
+# ------------------------------------------------------------
+def _build_rays():
+    rays = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        per_dir = []
+        for d_row, d_col in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            ray = 0
+            r, c = row + d_row, col + d_col
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray |= 1 << (r * 8 + c)
+                r, c = r + d_row, c + d_col
+            per_dir.append(ray)
+        rays.append(tuple(per_dir))
+    return tuple(rays)
+
+
+_RAYS = _build_rays()
+
+
+def _flips_from_rays(move_bb, opponent, fills):
+    """
+    _flips_from_fills と同じ結果を、シフトの代わりに _RAYS の表引きで求める (純 Python 用)。
+    光線上で着手位置に最も近い「相手石でないマス」までの間が候補の列で、
+    それを fill と重ねると反転対象になる。
+    """
+    r_e, r_w, r_n, r_s, r_ne, r_nw, r_se, r_sw = _RAYS[move_bb.bit_length() - 1]
+    f_e, f_w, f_n, f_s, f_ne, f_nw, f_se, f_sw = fills
+    blockers = ~opponent
+
+    # fill は自分の石から見た向きなので、着手位置からは逆向きの光線と組み合わせる
+    # インデックスが増える方向 (東・北・北東・北西): 最下位の blocker より下が候補
+    b = r_e & blockers
+    total = r_e & ((b & -b) - 1) & f_w
+    b = r_n & blockers
+    total |= r_n & ((b & -b) - 1) & f_s
+    b = r_ne & blockers
+    total |= r_ne & ((b & -b) - 1) & f_sw
+    b = r_nw & blockers
+    total |= r_nw & ((b & -b) - 1) & f_se
+
+    # インデックスが減る方向 (西・南・南東・南西): 最上位の blocker より上が候補
+    b = r_w & blockers
+    total |= r_w & ~((1 << b.bit_length()) - 1) & f_e
+    b = r_s & blockers
+    total |= r_s & ~((1 << b.bit_length()) - 1) & f_n
+    b = r_se & blockers
+    total |= r_se & ~((1 << b.bit_length()) - 1) & f_nw
+    b = r_sw & blockers
+    total |= r_sw & ~((1 << b.bit_length()) - 1) & f_ne
+
+    return total
+
+
+# ------------------------------------------------------------
+# C 版カーネルの読み込み (cc -O3 -march=native -shared -fPIC -o libbitboard_kernels.so bitboard_kernels.c)
+# ------------------------------------------------------------
+def _load_c_kernels():
+    if FFI is None:
+        return None, None
+    ffi = FFI()
+    ffi.cdef("""
+        uint64_t legal_moves(uint64_t player, uint64_t opponent);
+        uint64_t moves_and_fills(uint64_t player, uint64_t opponent, uint64_t empty, uint64_t *fills);
+        uint64_t flips_from_fills(uint64_t move, uint64_t opponent, const uint64_t *fills);
+    """)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "libbitboard_kernels.so")
+    try:
+        return ffi, ffi.dlopen(path)
+    except OSError:  # 未ビルドなら numba / 純 Python 版を使う
+        return None, None
+
+
+_ffi, _lib = _load_c_kernels()
+
+
+if _lib is not None:
+    legal_moves_u64 = _lib.legal_moves
+
+    def moves_and_fills_u64(player, opponent, empty):
+        # fill は C の配列のまま持っておき、flips_from_fills にそのまま渡す
+        fills = _ffi.new("uint64_t[8]")
+        return _lib.moves_and_fills(player, opponent, empty, fills), fills
+
+    flips_from_fills_u64 = _lib.flips_from_fills
+elif numba is not None:
+    legal_moves_u64 = numba.njit(numba.uint64(numba.uint64, numba.uint64), cache=True)(_legal_moves)
+    _fills_t = numba.types.UniTuple(numba.uint64, 8)
+    moves_and_fills_u64 = numba.njit(
+        numba.types.Tuple((numba.uint64, _fills_t))(numba.uint64, numba.uint64, numba.uint64), cache=True)(_moves_and_fills)
+    flips_from_fills_u64 = numba.njit(
+        numba.uint64(numba.uint64, numba.uint64, _fills_t), cache=True)(_flips_from_fills)
+else:
+    legal_moves_u64 = _legal_moves
+    moves_and_fills_u64 = _moves_and_fills
+    # インタプリタではシフトを重ねるより表引きの方が速い
+    flips_from_fills_u64 = _flips_from_rays
+
+
+# ------------------------------------------------------------
+# 複数局面の合法手をまとめて計算 (探索のフロンティアを 1 手ごとに一括処理する用途)
+# ------------------------------------------------------------
+_legal_moves_vec = None
+
+
+def _get_legal_moves_vec():
+    # numba.vectorize は呼び出すたびにその場でコンパイルされてキャッシュも効かないので、
+    # import 時ではなく最初に legal_moves_batch が呼ばれたときに一度だけ作る
+    global _legal_moves_vec
+    if _legal_moves_vec is None:
+        if numba is not None:
+            _legal_moves_vec = numba.vectorize(['uint64(uint64, uint64)'], target='parallel')(_legal_moves)
+        else:
+            # numpy の ufunc が uint64 配列のシフト・論理演算を SIMD で回してくれる
+            _legal_moves_vec = _legal_moves
+    return _legal_moves_vec
+
+
+def legal_moves_batch(player, opponent):
+    """
+    player, opponent: 手番側 / 相手側のビットボードを並べた uint64 配列 (同じ長さ)
+    戻り値: 各局面の合法手ビットボードを並べた uint64 配列
+    """
+    if np is None:
+        raise ImportError("legal_moves_batch には numpy が必要です")
+    player = np.asarray(player, dtype=np.uint64)
+    opponent = np.asarray(opponent, dtype=np.uint64)
+    return _get_legal_moves_vec()(player, opponent)
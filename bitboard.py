@@ -1,6 +1,39 @@
-from typing import List, Tuple
+import sys
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy は探索用の配列変換 (to_array) でだけ使う
+    np = None
+
+from _kernels import flips_from_fills_u64, legal_moves_u64, moves_and_fills_u64
+
+# 立っているビット数を数える (Python 3.10 以降は int.bit_count = POPCNT を使う)
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:
+    def _popcount(x: int) -> int:
+        return bin(x).count("1")
+
+# ビットインデックス (0~63) ⇔ 位置文字列 ("A1"~"H8") の対応表
+_SQUARE_NAMES = tuple(f"{chr(ord('A') + i % 8)}{i // 8 + 1}" for i in range(64))
+_SQUARE_TO_INDEX = {name: i for i, name in enumerate(_SQUARE_NAMES)}
+
+# 盤面表示用の列見出しと行番号
+_BOARD_HEADER = "  A B C D E F G H\n"
+_ROW_LABELS = tuple(str(row + 1) for row in range(8))
 
 class BitBoard:
+    # インスタンス属性は固定なので __dict__ を持たせない (属性アクセスが速く、オブジェクトも小さくなる)
+    __slots__ = ('_black', '_white', '_current_player', '_legal_cache')
+
+    # ------------------------------------------------------------
+    # 状態の書き換えについて
+    #   _legal_cache は black / white / 手番から導出してキャッシュしている。
+    #   black / white / current_player はプロパティで、外から代入してもキャッシュを捨てるので
+    #   そのまま局面を差し替えてよい。クラス内部ではスロット (_black など) を直接読み書きする。
+    # ------------------------------------------------------------
+
     # ------------------------------------------------------------
     # 盤面を左右上下斜め８方向にビットシフトするときに使う定数マスク
     #   方向ごとに行をまたいでしまうシフトを防ぐためのマスクを予め定義しておく。
@@ -18,21 +51,85 @@ class BitBoard:
     # 初期化 (スタートポジションをセット)
     # ------------------------------------------------------------
     def __init__(self):
-        # 黒石の初期配置： D4(27), E5(36)
-        self.black = (1 << 27) | (1 << 36)
-        # 白石の初期配置： D5(35), E4(28)
-        self.white = (1 << 35) | (1 << 28)
+        # 黒石の初期配置： D4(27), E5(36) / 白石の初期配置： D5(35), E4(28)
+        self._set_state((1 << 27) | (1 << 36), (1 << 35) | (1 << 28), 'B')
+
+    # ------------------------------------------------------------
+    # 任意の局面から生成 (初期配置を経由しない。web のセッション復元などで使う)
+    # ------------------------------------------------------------
+    @classmethod
+    def _from_state(cls, black: int, white: int, current_player: str) -> "BitBoard":
+        board = cls.__new__(cls)
+        board._set_state(black, white, current_player)
+        return board
+
+    # ------------------------------------------------------------
+    # 局面をセットし、そこから導出されるフィールドも作り直す
+    #   __slots__ に導出フィールドを足したら、ここで初期化すること
+    # ------------------------------------------------------------
+    def _set_state(self, black: int, white: int, current_player: str):
+        self._black = black
+        self._white = white
         # 手番: 'B' が黒、'W' が白
-        self.current_player = 'B'
+        self._current_player = current_player
+        # 現在の手番の (合法手ビットボード, 8方向の fill) のキャッシュ (None なら未計算)
+        #   盤面か手番が変わったら None に戻すこと
+        self._legal_cache = None
+
+    # ------------------------------------------------------------
+    # 黒石・白石のビットボード。変更すると合法手のキャッシュを捨てる
+    # ------------------------------------------------------------
+    @property
+    def black(self) -> int:
+        return self._black
+
+    @black.setter
+    def black(self, bb: int):
+        self._black = bb
+        self._legal_cache = None
+
+    @property
+    def white(self) -> int:
+        return self._white
+
+    @white.setter
+    def white(self, bb: int):
+        self._white = bb
+        self._legal_cache = None
+
+    # ------------------------------------------------------------
+    # 手番 ('B' が黒、'W' が白)。変更すると合法手のキャッシュを捨てる
+    # ------------------------------------------------------------
+    @property
+    def current_player(self) -> str:
+        return self._current_player
+
+    @current_player.setter
+    def current_player(self, player: str):
+        self._current_player = player
+        self._legal_cache = None
 
     # ------------------------------------------------------------
     # ユーティリティ: 現在の手番の石ビットボードと相手の石ビットボードを返す
     # ------------------------------------------------------------
     def _get_player_bitboards(self) -> Tuple[int, int]:
-        if self.current_player == 'B':
-            return self.black, self.white
+        if self._current_player == 'B':
+            return self._black, self._white
         else:
-            return self.white, self.black
+            return self._white, self._black
+
+    # ------------------------------------------------------------
+    # 探索用: (手番側, 相手側) のビットボードを uint64 の ndarray にして返す
+    # ------------------------------------------------------------
+    def to_array(self):
+        """
+        戻り値: shape=(2,) の uint64 配列 [手番側, 相手側]
+        複数局面を np.stack して shape=(N, 2) のフロンティアにすれば、
+        _kernels.legal_moves_batch(boards[:, 0], boards[:, 1]) で合法手を一括計算できる。
+        """
+        if np is None:
+            raise ImportError("to_array には numpy が必要です")
+        return np.array(self._get_player_bitboards(), dtype=np.uint64)
 
     # ------------------------------------------------------------
     # ユーティリティ: 位置文字列 (例: 'D3') をビットインデックス (0～63) に変換
@@ -44,9 +141,17 @@ class BitBoard:
         square: 例えば "D3" のように、列(A~H)+行(1~8) の２文字
         戻り値: ビットインデックス 0~63
         """
-        col = ord(square[0].upper()) - ord('A')  # 0〜7
-        row = int(square[1]) - 1                # 0〜7
-        return row * 8 + col
+        return _SQUARE_TO_INDEX[square.upper()]
+
+    @staticmethod
+    def parse_square(square: Optional[str]) -> Optional[int]:
+        """
+        square_to_index と同じ変換だが、未指定 (None / 空文字) や
+        盤外のマス名 (例: "Z9", "D33") には例外ではなく None を返す
+        """
+        if not square:
+            return None
+        return _SQUARE_TO_INDEX.get(square.upper())
 
     # ------------------------------------------------------------
     # ビットインデックス (0~63) を位置文字列 (例: 'D3') に変換
@@ -57,30 +162,33 @@ class BitBoard:
         index: 0〜63
         戻り値: 文字列 "A1"〜"H8"
         """
-        row = index // 8     # 0〜7
-        col = index % 8      # 0〜7
-        return f"{chr(col + ord('A'))}{row + 1}"
+        return _SQUARE_NAMES[index]
 
     # ------------------------------------------------------------
     # 盤面をASCII表示 (人間が見やすい形で出力)
     # ------------------------------------------------------------
     def print_board(self):
-        black, white = self._get_player_bitboards() if self.current_player == 'B' else (self.white, self.black)
+        # 64 マス分のセルを空きマスで埋め、石のあるビットだけを書き換える
+        cells = ["-"] * 64
+        bb = self.black
+        while bb:
+            lsb = bb & -bb
+            cells[lsb.bit_length() - 1] = "●"  # 黒石
+            bb ^= lsb
+        bb = self.white
+        while bb:
+            lsb = bb & -bb
+            cells[lsb.bit_length() - 1] = "○"  # 白石
+            bb ^= lsb
         # ただし、表示上は常に上が8行目、下が1行目。
-        print("  A B C D E F G H")
+        # 全行を 1 つの文字列に組み立ててから 1 回で書き出す
+        out = [_BOARD_HEADER]
         for row in range(7, -1, -1):
-            line = f"{row+1} "
-            for col in range(8):
-                idx = row * 8 + col
-                mask = 1 << idx
-                if (self.black >> idx) & 1:
-                    line += "● "  # 黒石
-                elif (self.white >> idx) & 1:
-                    line += "○ "  # 白石
-                else:
-                    line += "- "  # 空きマス
-            print(line + f"{row+1}")
-        print("  A B C D E F G H\n")
+            label = _ROW_LABELS[row]
+            out.append(f"{label} {' '.join(cells[row * 8:row * 8 + 8])} {label}\n")
+        out.append(_BOARD_HEADER)
+        out.append("\n")
+        sys.stdout.write("".join(out))
 
     # ------------------------------------------------------------
     # 現在の手番プレイヤー（player）の合法手ビットボードを計算する
@@ -90,75 +198,20 @@ class BitBoard:
         返却値: ビットボード (64ビット整数) で、合法手になり得るマスが 1 になっている。
         見方: たとえば (moves >> i) & 1 == 1 なら、ビット i（マス i）は合法手。
         """
-        player, opponent = self._get_player_bitboards()
-        empty = ~(player | opponent) & 0xFFFFFFFFFFFFFFFF  # 盤外ビットを消す
-
-        legal_moves = 0
-        # 8方向それぞれについて、一度に“はさみ”を検出する
-        # 1) 隣接マスが opponent の石であるものを見つける
-        # 2) 連続して相手の石が続くもの全体を追尾
-        # 3) その先にプレイヤーの石があれば、その隣接空きマスを“合法手”に加える
-
-        # --- 東 (East) 方向 ---
-        mask = opponent & ~self.MASK_FILE_H  # H列へはみ出すもの除去
-        flip_candidates = mask & (player << 1)
-        # 周辺の相手石をすべて取り込みつつ、
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates << 1)))
-            flip_candidates = mask & (flip_candidates << 1)
-
-        # --- 西 (West) 方向 ---
-        mask = opponent & ~self.MASK_FILE_A
-        flip_candidates = mask & (player >> 1)
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates >> 1)))
-            flip_candidates = mask & (flip_candidates >> 1)
-
-        # --- 北 (North) 方向 ---
-        mask = opponent
-        flip_candidates = mask & (player << 8)
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates << 8)))
-            flip_candidates = mask & (flip_candidates << 8)
-
-        # --- 南 (South) 方向 ---
-        mask = opponent
-        flip_candidates = mask & (player >> 8)
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates >> 8)))
-            flip_candidates = mask & (flip_candidates >> 8)
-
-        # --- 北東 (NorthEast) 方向 ---
-        mask = opponent & ~self.MASK_FILE_H
-        flip_candidates = mask & (player << 9)
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates << 9)))
-            flip_candidates = mask & (flip_candidates << 9)
-
-        # --- 北西 (NorthWest) 方向 ---
-        mask = opponent & ~self.MASK_FILE_A
-        flip_candidates = mask & (player << 7)
-        while flip_candidates:
-            legal_moves |= (legal_moves | (empty & (flip_candidates << 7)))
-            flip_candidates = mask & (flip_candidates << 7)
-
-        # --- 南東 (SouthEast) 方向 ---
-        mask = opponent & ~self.MASK_FILE_H
-        flip_candidates = mask & (player >> 7)
-        while flip_candidates:
-            # flip_candidates = mask & (flip_candidates >> 7)
-            legal_moves |= (legal_moves | (empty & (flip_candidates >> 7)))
-            flip_candidates = mask & (flip_candidates >> 7)
-
-        # --- 南西 (SouthWest) 方向 ---
-        mask = opponent & ~self.MASK_FILE_A
-        flip_candidates = mask & (player >> 9)
-        while flip_candidates:
-            # flip_candidates = mask & (flip_candidates >> 9)
-            legal_moves |= (legal_moves | (empty & (flip_candidates >> 9)))
-            flip_candidates = mask & (flip_candidates >> 9)
-
-        return legal_moves & 0xFFFFFFFFFFFFFFFF  # 余分な上位ビットを消しておく
+        return self._moves_and_fills()[0]
+
+    # ------------------------------------------------------------
+    # 合法手と、反転計算で再利用する 8方向の fill をまとめて計算 (キャッシュ付き)
+    # ------------------------------------------------------------
+    def _moves_and_fills(self) -> Tuple[int, Tuple[int, ...]]:
+        cache = self._legal_cache
+        if cache is None:
+            player, opponent = self._get_player_bitboards()
+            # 8方向の Kogge-Stone 展開は _kernels 側 (numba があれば JIT) で行う
+            empty = ~(player | opponent) & 0xFFFFFFFFFFFFFFFF
+            legal, fills = moves_and_fills_u64(player, opponent, empty)
+            cache = self._legal_cache = (int(legal), fills)
+        return cache
 
     # ------------------------------------------------------------
     # 着手してビットをひっくり返す (move: 0～63 のインデックス or 1ビット)
@@ -171,135 +224,25 @@ class BitBoard:
         else:
             move_bb = move
 
-        legal = self.get_legal_moves()
+        legal, fills = self._moves_and_fills()
         if (move_bb & legal) == 0:
             return False  # 合法手ではない
 
-        player, opponent = self._get_player_bitboards()
-        total_flips = 0
-
-        # 各方向で反転対象を集める
-        # 東
-        mask = opponent & ~self.MASK_FILE_H
-        flips = 0
-        cand = mask & (move_bb << 1)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand << 1)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand << 1) & player:
-            total_flips |= flips
-
-        # 西
-        mask = opponent & ~self.MASK_FILE_A
-        flips = 0
-        cand = mask & (move_bb >> 1)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand << 1)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand >> 1) & player:
-            total_flips |= flips
-
-        # 北
-        mask = opponent
-        flips = 0
-        cand = mask & (move_bb << 8)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand << 8)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand << 8) & player:
-            total_flips |= flips
-
-        # 南
-        mask = opponent
-        flips = 0
-        cand = mask & (move_bb >> 8)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand >> 8)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand >> 8) & player:
-            total_flips |= flips
-
-        # 北東
-        mask = opponent & ~self.MASK_FILE_H
-        flips = 0
-        cand = mask & (move_bb << 9)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand << 9)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand << 9) & player:
-            total_flips |= flips
-        # 北西
-        mask = opponent & ~self.MASK_FILE_A
-        flips = 0
-        cand = mask & (move_bb << 7)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand << 7)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand << 7) & player:
-            total_flips |= flips
-        # 南東
-        mask = opponent & ~self.MASK_FILE_H
-        flips = 0
-        cand = mask & (move_bb >> 7)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand >> 7)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand >> 7) & player:
-            total_flips |= flips
-        # 南西
-        mask = opponent & ~self.MASK_FILE_A
-        flips = 0
-        cand = mask & (move_bb >> 9)
-        while cand:
-            flips |= cand
-            tcand = mask & (cand >> 9)
-            if tcand == 0:
-                break
-            else:
-                cand = tcand
-        if (cand >> 9) & player:
-            total_flips |= flips
-
-        # 実際にビットを反転・追加
-        if self.current_player == 'B':
-            self.black ^= (move_bb | total_flips)
-            self.white ^= total_flips
-            self.black |= move_bb
+        # 合法手生成のときの fill を使い、着手位置から逆向きにたどるだけで反転石を求める
+        # (属性は一度だけ読み、手番で分岐した先ではローカル変数だけを使う)
+        black = self._black
+        white = self._white
+        if self._current_player == 'B':
+            total_flips = int(flips_from_fills_u64(move_bb, white, fills))
+            self._black = black | move_bb | total_flips
+            self._white = white ^ total_flips
+            self._current_player = 'W'  # 手番交代
         else:
-            self.white ^= (move_bb | total_flips)
-            self.black ^= total_flips
-            self.white |= move_bb
-
-        # 手番交代
-        self.current_player = 'W' if self.current_player == 'B' else 'B'
+            total_flips = int(flips_from_fills_u64(move_bb, black, fills))
+            self._white = white | move_bb | total_flips
+            self._black = black ^ total_flips
+            self._current_player = 'B'  # 手番交代
+        self._legal_cache = None
         return True
 
     # ------------------------------------------------------------
@@ -308,27 +251,27 @@ class BitBoard:
     def can_pass(self) -> bool:
         return self.get_legal_moves() == 0
 
+    # ------------------------------------------------------------
+    # パス (手番だけを相手に渡す)
+    # ------------------------------------------------------------
+    def pass_turn(self):
+        self.current_player = 'W' if self._current_player == 'B' else 'B'
+
     # ------------------------------------------------------------
     # ゲーム終了判定 (両者とも合法手なし)
     # ------------------------------------------------------------
     def is_game_over(self) -> bool:
         if self.get_legal_moves() != 0:
             return False
-        # 一度手番を入れ替えて相手の合法手を確認
-        print(self.get_legal_moves())
-        self.current_player = 'W' if self.current_player == 'B' else 'B'
-        has_moves = (self.get_legal_moves() != 0)
-        # 手番を戻す
-        self.current_player = 'W' if self.current_player == 'B' else 'B'
-        return not has_moves
+        # 相手の合法手は手番を入れ替えずに、引数を入れ替えて直接確認する
+        player, opponent = self._get_player_bitboards()
+        return legal_moves_u64(opponent, player) == 0
 
     # ------------------------------------------------------------
     # 現在スコア（黒, 白 の石数）を返す
     # ------------------------------------------------------------
     def get_score(self) -> Tuple[int, int]:
-        b_count = bin(self.black).count("1")
-        w_count = bin(self.white).count("1")
-        return b_count, w_count
+        return _popcount(self.black), _popcount(self.white)
 
     # ------------------------------------------------------------
     # 合法手を ["D3","C4",...] のように文字列リストで取得
@@ -336,9 +279,11 @@ class BitBoard:
     def list_legal_moves(self) -> List[str]:
         legal_bb = self.get_legal_moves()
         moves = []
-        for i in range(64):
-            if (legal_bb >> i) & 1:
-                moves.append(self.index_to_square(i))
+        # 最下位の 1 ビットを取り出しては消す (立っているビットの数だけ回る)
+        while legal_bb:
+            lsb = legal_bb & -legal_bb
+            moves.append(self.index_to_square(lsb.bit_length() - 1))
+            legal_bb ^= lsb
         return moves
 
 def main():
@@ -369,8 +314,9 @@ def main():
                 print("引き分けです。")
             break
 
-        # 合法手表示
+        # 合法手表示 (入力の検証にも使うので集合にしておく)
         legal_moves = game.list_legal_moves()
+        legal_set = frozenset(legal_moves)
         if legal_moves:
             print("合法手:", " ".join(legal_moves))
         else:
@@ -382,7 +328,7 @@ def main():
         # pass の場合
         if user_input == "PASS":
             if game.can_pass():
-                game.current_player = 'W' if game.current_player == 'B' else 'B'
+                game.pass_turn()
                 print("パスしました。\n")
                 continue
             else:
@@ -391,19 +337,15 @@ def main():
 
         # 位置入力 (例: D3)
         if len(user_input) == 2 and user_input[0] in "ABCDEFGH" and user_input[1] in "12345678":
-            try:
-                idx = BitBoard.square_to_index(user_input)
-            except Exception:
-                print("入力が不正です。もう一度入力してください。\n")
-                continue
-
-            if not game.make_move(idx):
+            # 合法手かどうかは手番ごとに作った集合で判定する (不正入力で合法手を再計算しない)
+            if user_input not in legal_set:
                 print("その位置は合法手ではありません。もう一度入力してください。\n")
                 continue
-            else:
-                # 着手成功
-                print(f"{user_input} に着手しました。\n")
-                continue
+
+            game.make_move(BitBoard.square_to_index(user_input))
+            # 着手成功
+            print(f"{user_input} に着手しました。\n")
+            continue
         else:
             print("入力形式が正しくありません（例: D3 または pass）。\n")
             continue
@@ -0,0 +1,73 @@
+/*
+ * ビットボードの計算カーネル (C 版)
+ *   _kernels.py の純 Python / numba 版と同じ処理を uint64_t で行う。
+ *   ビルドすると _kernels.py が cffi 経由で自動的に読み込む:
+ *     cc -O3 -march=native -shared -fPIC -o libbitboard_kernels.so bitboard_kernels.c
+ *   (.so がない、または cffi が入っていない場合は numba / 純 Python 版が使われる)
+ */
+#include <stdint.h>
+
+/* A列・H列を除いた内側 6 列のマスク (横・斜め方向の回り込み防止用) */
+#define NOT_FILE_AH 0x7E7E7E7E7E7E7E7EULL
+
+/* Kogge-Stone の occluded fill: gen から pro の上だけを s, 2s, 4s ずつ塗り広げる */
+static inline uint64_t fill_left(uint64_t gen, uint64_t pro, int s)
+{
+    gen |= pro & (gen << s);
+    pro &= pro << s;
+    gen |= pro & (gen << (2 * s));
+    pro &= pro << (2 * s);
+    return gen | (pro & (gen << (4 * s)));
+}
+
+static inline uint64_t fill_right(uint64_t gen, uint64_t pro, int s)
+{
+    gen |= pro & (gen >> s);
+    pro &= pro >> s;
+    gen |= pro & (gen >> (2 * s));
+    pro &= pro >> (2 * s);
+    return gen | (pro & (gen >> (4 * s)));
+}
+
+/*
+ * 合法手のビットボードを返し、8方向ぶんの fill を fills[8] に書き込む。
+ * 方向の並びは 東, 西, 北, 南, 北東, 北西, 南東, 南西。
+ */
+uint64_t moves_and_fills(uint64_t player, uint64_t opponent, uint64_t empty, uint64_t *fills)
+{
+    uint64_t inner = opponent & NOT_FILE_AH;
+
+    fills[0] = fill_left(player, inner, 1) & inner;
+    fills[1] = fill_right(player, inner, 1) & inner;
+    fills[2] = fill_left(player, opponent, 8) & opponent;
+    fills[3] = fill_right(player, opponent, 8) & opponent;
+    fills[4] = fill_left(player, inner, 9) & inner;
+    fills[5] = fill_left(player, inner, 7) & inner;
+    fills[6] = fill_right(player, inner, 7) & inner;
+    fills[7] = fill_right(player, inner, 9) & inner;
+
+    return empty & ((fills[0] << 1) | (fills[1] >> 1) | (fills[2] << 8) | (fills[3] >> 8)
+                    | (fills[4] << 9) | (fills[5] << 7) | (fills[6] >> 7) | (fills[7] >> 9));
+}
+
+/* 合法手のビットボード (8方向の展開は moves_and_fills と共通にして、fill は捨てる) */
+uint64_t legal_moves(uint64_t player, uint64_t opponent)
+{
+    uint64_t fills[8];
+    return moves_and_fills(player, opponent, ~(player | opponent), fills);
+}
+
+/* 着手位置から fill と逆向きに相手石の列を塗り、fill と重なった部分 (= 反転する石) を返す */
+uint64_t flips_from_fills(uint64_t move, uint64_t opponent, const uint64_t *fills)
+{
+    uint64_t inner = opponent & NOT_FILE_AH;
+
+    return (fill_right(move, inner, 1) & fills[0])
+         | (fill_left(move, inner, 1) & fills[1])
+         | (fill_right(move, opponent, 8) & fills[2])
+         | (fill_left(move, opponent, 8) & fills[3])
+         | (fill_right(move, inner, 9) & fills[4])
+         | (fill_right(move, inner, 7) & fills[5])
+         | (fill_left(move, inner, 7) & fills[6])
+         | (fill_left(move, inner, 9) & fills[7]);
+}
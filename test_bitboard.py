@@ -0,0 +1,102 @@
+# ------------------------------------------------------------
+# BitBoard 本体 (手番・盤面の変更と合法手キャッシュの整合性) のテスト
+#   python -m unittest test_bitboard
+# ------------------------------------------------------------
+import random
+import unittest
+
+from bitboard import BitBoard
+from test_kernels import _reference_flips
+
+
+def _bit(square: str) -> int:
+    return 1 << BitBoard.square_to_index(square)
+
+
+def _reference_legal(player: int, opponent: int) -> int:
+    return sum(1 << sq for sq in range(64) if _reference_flips(player, opponent, sq))
+
+
+class BitBoardTest(unittest.TestCase):
+    def test_initial_legal_moves(self):
+        game = BitBoard()
+        self.assertEqual(game.list_legal_moves(), ["E3", "F4", "C5", "D6"])
+
+    def test_parse_square(self):
+        self.assertEqual(BitBoard.parse_square("d3"), BitBoard.square_to_index("D3"))
+        for square in (None, "", "Z9", "D33", "A9"):
+            self.assertIsNone(BitBoard.parse_square(square))
+
+    def test_assigning_current_player_updates_legal_moves(self):
+        game = BitBoard()
+        black_moves = game.get_legal_moves()  # キャッシュに載せておく
+        game.current_player = 'W'
+        self.assertEqual(game.get_legal_moves(), _reference_legal(game.white, game.black))
+        self.assertNotEqual(game.get_legal_moves(), black_moves)
+        game.current_player = 'B'
+        self.assertEqual(game.get_legal_moves(), black_moves)
+
+    def test_assigning_board_updates_legal_moves(self):
+        game = BitBoard()
+        game.get_legal_moves()
+        game.black = _bit("B2")
+        game.white = _bit("A1")
+        self.assertEqual(game.get_legal_moves(), 0)
+
+    def test_pass_turn(self):
+        game = BitBoard()
+        game.get_legal_moves()
+        game.pass_turn()
+        self.assertEqual(game.current_player, 'W')
+        self.assertEqual(game.get_legal_moves(), _reference_legal(game.white, game.black))
+        game.pass_turn()
+        self.assertEqual(game.current_player, 'B')
+
+    def test_is_game_over_when_only_opponent_can_move(self):
+        # 黒 B2 / 白 A1: 黒は着手できないが、白は C3 に打てる
+        game = BitBoard._from_state(_bit("B2"), _bit("A1"), 'B')
+        self.assertTrue(game.can_pass())
+        self.assertFalse(game.is_game_over())
+        # is_game_over は手番もキャッシュも変えない
+        self.assertEqual(game.current_player, 'B')
+        self.assertEqual(game.get_legal_moves(), 0)
+        game.pass_turn()
+        self.assertEqual(game.list_legal_moves(), ["C3"])
+
+    def test_is_game_over_when_neither_can_move(self):
+        game = BitBoard._from_state(_bit("A1"), _bit("H8"), 'B')
+        self.assertTrue(game.is_game_over())
+
+    def test_make_move_rejects_illegal_move(self):
+        game = BitBoard()
+        black, white = game.black, game.white
+        self.assertFalse(game.make_move(BitBoard.square_to_index("A1")))
+        self.assertEqual((game.black, game.white, game.current_player), (black, white, 'B'))
+
+    def test_random_games_keep_cache_consistent(self):
+        rnd = random.Random(11)
+        for _ in range(30):
+            game = BitBoard()
+            while True:
+                player, opponent = ((game.black, game.white) if game.current_player == 'B'
+                                    else (game.white, game.black))
+                legal = game.get_legal_moves()
+                self.assertEqual(legal, _reference_legal(player, opponent))
+                if not legal:
+                    if game.is_game_over():
+                        break
+                    game.pass_turn()
+                    continue
+                squares = [sq for sq in range(64) if (legal >> sq) & 1]
+                sq = rnd.choice(squares)
+                flips = _reference_flips(player, opponent, sq)
+                mover = game.current_player
+                self.assertTrue(game.make_move(sq))
+                after = (game.black, game.white) if mover == 'B' else (game.white, game.black)
+                self.assertEqual(after, (player | flips | (1 << sq), opponent & ~flips))
+            black, white = game.get_score()
+            self.assertEqual(black + white, bin(game.black | game.white).count("1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
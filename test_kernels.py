@@ -0,0 +1,94 @@
+# ------------------------------------------------------------
+# _kernels の各実装 (C / numba / 純 Python) が、マスごとに素朴に数えた
+# 参照実装とビット単位で一致することを確認するテスト
+#   python -m unittest test_kernels
+# ------------------------------------------------------------
+import random
+import unittest
+
+import _kernels
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+# (行の増分, 列の増分) 東, 西, 北, 南, 北東, 北西, 南東, 南西
+_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _reference_flips(player: int, opponent: int, sq: int) -> int:
+    """マス sq に着手したときに反転する石を、方向ごとに 1 マスずつたどって求める"""
+    if ((player | opponent) >> sq) & 1:
+        return 0
+    row, col = divmod(sq, 8)
+    total = 0
+    for d_row, d_col in _DIRECTIONS:
+        r, c = row + d_row, col + d_col
+        run = 0
+        while 0 <= r < 8 and 0 <= c < 8 and (opponent >> (r * 8 + c)) & 1:
+            run |= 1 << (r * 8 + c)
+            r, c = r + d_row, c + d_col
+        if run and 0 <= r < 8 and 0 <= c < 8 and (player >> (r * 8 + c)) & 1:
+            total |= run
+    return total
+
+
+def _random_positions(count: int, seed: int):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        # 石の密度も局面ごとに変えて、序盤〜終盤に近い盤面を混ぜる
+        density = rnd.random()
+        player = opponent = 0
+        for sq in range(64):
+            if rnd.random() < density:
+                if rnd.random() < 0.5:
+                    player |= 1 << sq
+                else:
+                    opponent |= 1 << sq
+        yield player, opponent
+
+
+class KernelTest(unittest.TestCase):
+    POSITIONS = 1000
+
+    def _check(self, legal_moves, moves_and_fills, flips_from_fills):
+        for player, opponent in _random_positions(self.POSITIONS, seed=2024):
+            empty = ~(player | opponent) & _MASK64
+            flips = {sq: _reference_flips(player, opponent, sq) for sq in range(64)}
+            expected = sum(1 << sq for sq, f in flips.items() if f)
+
+            self.assertEqual(int(legal_moves(player, opponent)), expected)
+            legal, fills = moves_and_fills(player, opponent, empty)
+            self.assertEqual(int(legal), expected)
+
+            bb = expected
+            while bb:
+                lsb = bb & -bb
+                sq = lsb.bit_length() - 1
+                self.assertEqual(int(flips_from_fills(lsb, opponent, fills)), flips[sq],
+                                 (hex(player), hex(opponent), sq))
+                bb ^= lsb
+
+    def test_selected_backend(self):
+        # import 時に選ばれた実装 (C / numba / 純 Python のいずれか)
+        self._check(_kernels.legal_moves_u64, _kernels.moves_and_fills_u64, _kernels.flips_from_fills_u64)
+
+    # numba 使用時はこれらの本体の定数が uint64 になり、_legal_moves も JIT 版を呼ぶので
+    # Python の int をそのまま渡せない (その場合は test_selected_backend が numba 版を確認する)
+    @unittest.skipIf(_kernels.numba is not None, "numba 使用時は純 Python 版として動かない")
+    def test_python_shift_kernels(self):
+        self._check(_kernels._legal_moves, _kernels._moves_and_fills, _kernels._flips_from_fills)
+
+    @unittest.skipIf(_kernels.numba is not None, "numba 使用時は純 Python 版として動かない")
+    def test_python_ray_table_flips(self):
+        self._check(_kernels._legal_moves, _kernels._moves_and_fills, _kernels._flips_from_rays)
+
+    @unittest.skipIf(_kernels.np is None, "numpy がない")
+    def test_legal_moves_batch(self):
+        positions = list(_random_positions(200, seed=7))
+        player = [p for p, _ in positions]
+        opponent = [o for _, o in positions]
+        got = _kernels.legal_moves_batch(player, opponent)
+        for (p, o), legal in zip(positions, got):
+            self.assertEqual(int(legal), int(_kernels.legal_moves_u64(p, o)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# ------------------------------------------------------------
+# web.py (セッションへの保存形式とルート) のテスト
+#   python -m unittest test_web    (flask が必要)
+# ------------------------------------------------------------
+import unittest
+
+try:
+    import flask
+except ImportError:
+    flask = None
+
+if flask is not None:
+    import web
+
+
+@unittest.skipIf(flask is None, "flask がない")
+class SessionStateTest(unittest.TestCase):
+    def test_pack_round_trip(self):
+        full = 0xFFFFFFFFFFFFFFFF
+        for black, white in (((1 << 27) | (1 << 36), (1 << 35) | (1 << 28)),
+                             (1 << 63, 1),
+                             (full ^ (1 << 62), 1 << 62),
+                             (0, full)):
+            for player in ('B', 'W'):
+                board = web.BitBoard._from_state(black, white, player)
+                restored = web._unpack(web._pack(board))
+                self.assertIsInstance(restored, web.BitBoard)
+                self.assertEqual((restored.black, restored.white, restored.current_player),
+                                 (black, white, player))
+                self.assertEqual(restored.get_legal_moves(), board.get_legal_moves())
+
+
+@unittest.skipIf(flask is None, "flask がない")
+class RoutesTest(unittest.TestCase):
+    def setUp(self):
+        web.app.config['TESTING'] = True
+        self.client = web.app.test_client()
+
+    def _state(self):
+        with self.client.session_transaction() as sess:
+            return sess.get('g')
+
+    def test_index(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/move?square=E3', response.get_data(as_text=True))
+
+    def test_legal_move_is_played(self):
+        response = self.client.get('/move?square=E3')
+        self.assertEqual(response.status_code, 302)
+        board = web._unpack(self._state())
+        self.assertEqual(board.current_player, 'W')
+
+    def test_bad_squares_are_ignored(self):
+        for url in ('/move', '/move?square=', '/move?square=Z9', '/move?square=D33', '/move?square=A9'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 302)
+                board = web._unpack(self._state())
+                self.assertEqual((board.black, board.white, board.current_player),
+                                 (web.BitBoard().black, web.BitBoard().white, 'B'))
+
+    def test_old_session_key_is_dropped(self):
+        with self.client.session_transaction() as sess:
+            sess['game'] = {'black': 1, 'white': 2, 'current_player': 'B'}
+        self.client.get('/')
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('game', sess)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,110 +1,64 @@
-from flask import Flask, session, redirect, url_for, render_template_string, request
-from typing import Tuple
+import base64
+import struct
+
+from flask import Flask, session, redirect, url_for, render_template, request
+
+import bitboard
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key'
 
-# ----- BitBoard クラス（省略可：実際は別ファイルに分けてもOK） -----
-class BitBoard:
-    MASK_FILE_A = 0x0101010101010101
-    MASK_FILE_H = 0x8080808080808080
-    MASK_FILE_AB = 0x0303030303030303
-    MASK_FILE_GH = 0xC0C0C0C0C0C0C0C0
-
-    def __init__(self):
-        self.black = (1 << 27) | (1 << 36)
-        self.white = (1 << 35) | (1 << 28)
-        self.current_player = 'B'
-
-    def _get_player_bitboards(self) -> Tuple[int, int]:
-        return (self.black, self.white) if self.current_player == 'B' else (self.white, self.black)
-
-    @staticmethod
-    def square_to_index(square: str) -> int:
-        col = ord(square[0].upper()) - ord('A')
-        row = int(square[1]) - 1
-        return row * 8 + col
-
-    @staticmethod
-    def index_to_square(index: int) -> str:
-        row, col = divmod(index, 8)
-        return f"{chr(col + ord('A'))}{row + 1}"
-
-    def get_legal_moves(self) -> int:
-        player, opponent = self._get_player_bitboards()
-        empty = ~(player | opponent) & 0xFFFFFFFFFFFFFFFF
-        legal = 0
-        directions = [(1, self.MASK_FILE_H), (-1, self.MASK_FILE_A), (8, 0), (-8, 0), (9, self.MASK_FILE_H), (7, self.MASK_FILE_A), (-7, self.MASK_FILE_H), (-9, self.MASK_FILE_A)]
-        for shift, mask_file in directions:
-            mask = opponent & ~mask_file
-            move_mask = (player << shift) if shift > 0 else (player >> -shift)
-            cand = mask & move_mask
-            while cand:
-                cand_shifted = (cand << shift) if shift > 0 else (cand >> -shift)
-                legal |= empty & cand_shifted
-                cand = mask & cand_shifted
-        return legal
+# ----- BitBoard クラス（合法手生成などの本体は bitboard.py / _kernels.py と共通） -----
+class BitBoard(bitboard.BitBoard):
+    __slots__ = ()
 
     def make_move(self, square: str) -> bool:
-        idx = self.square_to_index(square)
-        move_bb = 1 << idx
-        legal = self.get_legal_moves()
-        if not (move_bb & legal): return False
-        player, opponent = self._get_player_bitboards()
-        flips = 0
-        directions = [(1, self.MASK_FILE_H), (-1, self.MASK_FILE_A), (8, 0), (-8, 0), (9, self.MASK_FILE_H), (7, self.MASK_FILE_A), (-7, self.MASK_FILE_H), (-9, self.MASK_FILE_A)]
-        for shift, mask_file in directions:
-            mask = opponent & ~mask_file
-            line_flips = 0
-            cand = mask & (move_bb << shift if shift > 0 else move_bb >> -shift)
-            while cand:
-                line_flips |= cand
-                next_cand = mask & (cand << shift if shift > 0 else cand >> -shift)
-                if not next_cand:
-                    break
-                cand = next_cand
-            end_bit = (cand << shift) if shift > 0 else (cand >> -shift)
-            if end_bit & player:
-                flips |= line_flips
-        if self.current_player == 'B':
-            self.black ^= flips | move_bb
-            self.white ^= flips
-        else:
-            self.white ^= flips | move_bb
-            self.black ^= flips
-        self.current_player = 'W' if self.current_player == 'B' else 'B'
-        return True
+        # クエリ由来の文字列なので、未指定や盤外のマス名は着手せずに False を返す
+        idx = self.parse_square(square)
+        if idx is None:
+            return False
+        return super().make_move(idx)
 
     def list_board(self) -> list:
-        grid = []
-        for r in range(7, -1, -1):
-            row = []
-            for c in range(8):
-                idx = r * 8 + c
-                bit = 1 << idx
-                if self.black & bit:
-                    row.append('B')
-                elif self.white & bit:
-                    row.append('W')
-                else:
-                    row.append('')
-            grid.append(row)
-        return grid
+        cells = [''] * 64
+        for color, bb in (('B', self.black), ('W', self.white)):
+            while bb:
+                lsb = bb & -bb
+                cells[lsb.bit_length() - 1] = color
+                bb ^= lsb
+        return [cells[r * 8:r * 8 + 8] for r in range(7, -1, -1)]
 
     def list_legal(self) -> list:
         moves = self.get_legal_moves()
-        return [self.index_to_square(i) for i in range(64) if (moves >> i) & 1]
+        legal = []
+        while moves:
+            lsb = moves & -moves
+            legal.append(self.index_to_square(lsb.bit_length() - 1))
+            moves ^= lsb
+        return legal
 
 # ----- セッションから BitBoard の取得・保存 -----
+# セッションには (黒, 白, 手番) を struct で 17 バイトに詰めて base64 文字列として保存する
+_STATE = struct.Struct('<QQB')
+
+def _pack(board) -> str:
+    state = _STATE.pack(board.black, board.white, 0 if board.current_player == 'B' else 1)
+    return base64.b64encode(state).decode('ascii')
+
+def _unpack(data: str) -> BitBoard:
+    black, white, turn = _STATE.unpack(base64.b64decode(data))
+    return BitBoard._from_state(black, white, 'B' if turn == 0 else 'W')
+
 def get_game():
-    if 'game' not in session:
-        session['game'] = BitBoard().__dict__
-    board = BitBoard()
-    board.__dict__.update(session['game'])
-    return board
+    # 旧形式 ('game' に __dict__ を丸ごと保存していたもの) が残っていれば捨ててクッキーを縮める
+    session.pop('game', None)
+    data = session.get('g')
+    if data is None:
+        return BitBoard()
+    return _unpack(data)
 
 def save_game(board):
-    session['game'] = board.__dict__
+    session['g'] = _pack(board)
 
 # ----- テンプレート定義 -----
 TEMPLATE = '''
@@ -137,17 +91,22 @@ table{border-collapse:collapse;}td{width:40px;height:40px;text-align:center;bord
 </body>
 </html>
 '''
+# テンプレートはリクエストごとにパースせず、起動時に一度だけコンパイルしておく
+# (url_for などのグローバルが使えるよう、Flask アプリの Jinja 環境でコンパイルする)
+_TEMPLATE = app.jinja_env.from_string(TEMPLATE)
+# 盤面の列・行ラベル (表示上は上が 8 行目)
+COLS = ['A','B','C','D','E','F','G','H']
+ROWS = ['8','7','6','5','4','3','2','1']
 
 # ----- ルート定義 -----
 @app.route('/')
 def index():
     game = get_game()
     board = game.list_board()
-    legal = game.list_legal()
+    # テンプレートでは 64 マスそれぞれ `sq in legal` を判定するので集合で渡す
+    legal = frozenset(game.list_legal())
     player = 'Black' if game.current_player == 'B' else 'White'
-    cols = ['A','B','C','D','E','F','G','H']
-    rows = ['8','7','6','5','4','3','2','1']
-    return render_template_string(TEMPLATE, board=board, legal=legal, player=player, cols=cols, rows=rows)
+    return render_template(_TEMPLATE, board=board, legal=legal, player=player, cols=COLS, rows=ROWS)
 
 @app.route('/move')
 def move():
@@ -159,7 +118,7 @@ def move():
 
 @app.route('/reset')
 def reset():
-    session.pop('game', None)
+    session.pop('g', None)
     return redirect(url_for('index'))
 
 if __name__ == '__main__':